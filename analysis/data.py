@@ -1,23 +1,66 @@
 """
 This encapsulates all classes / methods used to prepare data stored in the database for further analysis (or just show)
 """
+import numpy as np
 from scipy import stats
 
 from persistence.analysis import *
+from datetime import datetime, timedelta
+
+
+def day_start(the_date: datetime) -> datetime:
+    """
+    Returns midnight opening the day of the given timestamp
+    """
+    return datetime(year=the_date.year, month=the_date.month, day=the_date.day)
+
+
+def day_end(the_date: datetime) -> datetime:
+    """
+    Returns the last second of the day of the given timestamp
+    """
+    return day_start(the_date) + timedelta(days=1, seconds=-1)
 
 
 class AnalysisDataSource:
 
+    # each cached chronology pins a full day of raw records, so the cache is kept bounded;
+    # at ~1k entries the oldest-used one is dropped
+    CHRONOLOGY_CACHE_SIZE = 1024
+
     def __init__(self, db: str, host: str, user: str, password: str):
         self.persistence = AnalysisPersistence(db=db, host=host, user=user, password=password)
+        # chronologies of past days are immutable, so once built they are kept for reuse
+        self._historical_chronologies = {}
 
     def temperature_daily_chronology(self, sensor_location: str, the_date: datetime = datetime.now()):
+        _key = sensor_location, the_date.year, the_date.month, the_date.day
+        _is_historical = the_date.date() < datetime.now().date()
+
+        if _is_historical and _key in self._historical_chronologies:
+            # re-insertion marks the entry as most recently used, so the eviction
+            # below drops the least recently used day first
+            _chronology = self._historical_chronologies.pop(_key)
+            self._historical_chronologies[_key] = _chronology
+            return _chronology
+
         _the_sensor = self.persistence.get_sensor_by_location(sensor_location=sensor_location,
                                                               sensor_type_name=SENSORTYPE_TEMPERATURE)
-        return TemperatureDailyChronology(
+        _chronology = TemperatureDailyChronology(
             self.persistence.temperature_daily_chronology(the_sensor=_the_sensor, the_date=the_date),
             the_date=the_date)
 
+        if _is_historical:
+            # build the lazy views before the instance becomes visible to other threads;
+            # the _init_* methods mutate shared lists and are not synchronized
+            _chronology.get_raw_timeline()
+            _chronology.get_perhour_timeline()
+            self._historical_chronologies[_key] = _chronology
+            if len(self._historical_chronologies) > self.CHRONOLOGY_CACHE_SIZE:
+                del self._historical_chronologies[next(iter(self._historical_chronologies))]
+
+        return _chronology
+
 
 class TemperatureDailyChronology:
 
@@ -64,53 +107,44 @@ class TemperatureDailyChronology:
         self._ph_errors_lower = list()
         self._ph_errors = list()
 
+        # the raw readings converted once into contiguous arrays (epoch seconds and degrees);
+        # each time-mark below is then handled with vectorized masks instead of a Python scan
+        _count = len(self._raw_records)
+        _timestamps = np.fromiter((_r.timestamp.timestamp() for _r in self._raw_records),
+                                  dtype=np.float64, count=_count)
+        _temperatures = np.fromiter((_r.temperature for _r in self._raw_records),
+                                    dtype=np.float64, count=_count)
+
         for _h in self._ph_timeline:
-            # find both the closest reading in the past and in the future
-            # together with value from last and next hour from the timemark _h
-            closest_down = None
-            closest_up = None
-            last_hour = list()
-            next_hour = list()
-
-            for _r in self._raw_records:
-                if _h > _r.timestamp:
-                    closest_down = _r
-                if _h < _r.timestamp and not closest_up:
-                    closest_up = _r
-                if 0 < (_h - _r.timestamp).total_seconds() <= 60*60:
-                    last_hour.append(_r)
-                if 0 >= (_h - _r.timestamp).total_seconds() >= -60*60:
-                    next_hour.append(_r)
+            # seconds from the time-mark; negative lies in the past, positive towards future
+            _deltas = _timestamps - _h.timestamp()
 
             # collect observations that will be considered to calculate
-            # the best-approximation of temperature at given hour
-            # if there is no observation within an hour (in past and towards future), choose the closest reading
-            observations = list()
-            if len(last_hour) > 0:
-                observations.extend(last_hour)
-            elif closest_down:
-                observations.append(closest_down)
-            if len(next_hour) > 0:
-                observations.extend(next_hour)
-            elif closest_up:
-                observations.append(closest_up)
-
-            if len(observations) > 1:
-                # for the linear regression choose the first non-empty: last\next hour or closest value
+            # the best-approximation of temperature at given hour: readings from last
+            # and next hour around the time-mark; if there is no observation within
+            # an hour on either side, choose the closest reading on that side
+            _past = np.nonzero((_deltas >= -60*60) & (_deltas < 0))[0]
+            _future = np.nonzero((_deltas >= 0) & (_deltas <= 60*60))[0]
+
+            if _past.size == 0:
+                _past = np.nonzero(_deltas < 0)[0][-1:]
+            if _future.size == 0:
+                _future = np.nonzero(_deltas > 0)[0][:1]
+
+            _observations = np.concatenate((_past, _future))
+            _y = _temperatures[_observations]
+
+            if _observations.size > 1:
                 # x: seconds from time-mark, y: the temperature at given point
-                y = [observation.temperature for observation in observations]
-                x = [(observation.timestamp - _h).total_seconds() for observation in observations]
-                lr_res = stats.linregress(x, y)
+                lr_res = stats.linregress(_deltas[_observations], _y)
                 # intercept is the temperature I'm looking for
                 self._ph_temperatures.append(float(lr_res.intercept))
-            elif len(observations) == 1:
-                self._ph_temperatures.append(observations[0].temperature)
+            elif _observations.size == 1:
+                self._ph_temperatures.append(float(_y[0]))
 
             # calculate min and max within the observations and then subtract from 'average' value to get errors
-            self._ph_errors_lower.append(abs(self._ph_temperatures[-1] - min(
-                [observation.temperature for observation in observations])))
-            self._ph_errors_upper.append(abs(self._ph_temperatures[-1] - max(
-                [observation.temperature for observation in observations])))
+            self._ph_errors_lower.append(abs(self._ph_temperatures[-1] - float(_y.min())))
+            self._ph_errors_upper.append(abs(self._ph_temperatures[-1] - float(_y.max())))
 
     def get_raw_timeline(self) -> list:
         if not self._raw_timeline:
@@ -1,7 +1,9 @@
 """
 The file collects routines used to prepare matplotlib graphs
 """
-import matplotlib.pyplot as plt
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_svg import FigureCanvasSVG
 from matplotlib.dates import DateFormatter
 from matplotlib import ticker
 from datetime import timedelta
@@ -9,11 +11,17 @@ import io
 
 from analysis.data import *
 
+# figures are created directly (without pyplot), so they are not tracked in the global registry
+# and simply get garbage-collected; mute the warning in case some other code path still uses pyplot
+matplotlib.rcParams['figure.max_open_warning'] = 0
+
 
 class Graph:
     def __init__(self, data_source: AnalysisDataSource):
         self.data_source = data_source
-        self.figure, self.axis = plt.subplots()
+        self.figure = Figure()
+        self.canvas = FigureCanvasSVG(self.figure)
+        self.axis = self.figure.subplots()
 
     def prepare_plot(self):
         raise NotImplementedError()
@@ -21,7 +29,7 @@ class Graph:
     def plot_to_svg(self) -> bytes:
         self.prepare_plot()
         res = io.BytesIO()
-        plt.savefig(res, format='svg')
+        self.canvas.print_svg(res)
         return res.getvalue()
 
 
@@ -49,19 +57,21 @@ class DailyTemperatureGraph(Graph):
 
         if self.last_temp:
             self.axis.scatter(self.last_temp[0], self.last_temp[1], marker='h')
-            self.axis.annotate(f'  {self.last_temp[1]:.1f} \u2103', self.last_temp)
 
         _min = self.data.get_min()
         self.axis.scatter(_min[0], _min[1])
-        self.axis.annotate(f'  {_min[1]:.1f} \u2103', _min)
         _max = self.data.get_max()
         self.axis.scatter(_max[0], _max[1])
-        self.axis.annotate(f'  {_max[1]:.1f} \u2103', _max)
+
+        _annotation_style = dict(xytext=(3, 0), textcoords='offset points')
+        for _point in (self.last_temp, _min, _max):
+            if _point:
+                self.axis.annotate('%.1f \u2103' % _point[1], _point, **_annotation_style)
 
         self.axis.set_title(self.title)
         self.axis.set_ylabel('\u2103')
-        self.axis.set_xlim(datetime(self.the_date.year, self.the_date.month, self.the_date.day, 0, 0, 0),
-                           datetime(self.the_date.year, self.the_date.month, self.the_date.day, 0, 0, 0) + timedelta(days=1))
+        _day_start = day_start(self.the_date)
+        self.axis.set_xlim(_day_start, _day_start + timedelta(days=1))
         self.axis.xaxis_date()
         self.axis.xaxis.set_major_formatter(DateFormatter('%H'))
         self.axis.xaxis.set_tick_params(labelrotation=90)
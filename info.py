@@ -1,36 +1,74 @@
 from flask import Flask, Response
 from flask import request as frequest
 from datetime import datetime
+from functools import cached_property
+import gzip
 
 from localconfig import Configuration
 import remote
 import analysis.data as a_data
-import analysis.graph as a_graph
+
+try:
+    # optional speed-up of response serialization; flask's default provider is used when absent
+    from flask_orjson import OrjsonProvider
+except ImportError:
+    OrjsonProvider = None
 
 
 class InfoApp(Flask):
 
     def __init__(self, name):
         Flask.__init__(self, import_name=name)
+        if OrjsonProvider is not None:
+            # every bean_jsonified response is encoded by this provider; orjson handles
+            # the datetimes carried by the beans natively instead of via python callbacks
+            self.json = OrjsonProvider(self)
         self.info_config = Configuration()
         self.data_source = a_data.AnalysisDataSource(
             db=self.info_config.get_db(),
             user=self.info_config.get_db_user(),
             password=self.info_config.get_db_password(),
             host=self.info_config.get_db_host())
-        self.remote_temperature = remote.Temperature(self.info_config.get_temperature_hosts())
-        self.remote_pressure = remote.TendencyValue(self.info_config.get_pressure_host())
-        self.remote_humidity_in = remote.TendencyValue(self.info_config.get_humidity_host())
-        self.remote_air_quality = remote.AirQuality(self.info_config.get_air_quality_host(),
-                                                    norm_pm_10=self.info_config.get_air_quality_norm_pm_10(),
-                                                    norm_pm_2_5=self.info_config.get_air_quality_norm_pm_2_5())
-        self.remote_cesspit = remote.Cesspit(self.info_config.get_cesspit_host(),
-                                             delay_denoting_failure_min=self.info_config.get_cesspit_delay_denoting_failure_min(),
-                                             warning_level=self.info_config.get_cesspit_warning_level(),
-                                             critical_level=self.info_config.get_cesspit_critical_level())
-        self.remote_daylight = remote.Daylight(self.info_config.get_daylight_host())
-        self.remote_rain = remote.Rain(self.info_config.get_rain_host())
-        self.remote_soil_moisture = remote.SoilMoisture(self.info_config.get_soil_moisture_host())
+
+    # the remote clients are built lazily, on the first request that actually needs them;
+    # a worker that never serves a given endpoint never pays for its construction
+
+    @cached_property
+    def remote_temperature(self):
+        return remote.Temperature(self.info_config.get_temperature_hosts())
+
+    @cached_property
+    def remote_pressure(self):
+        return remote.TendencyValue(self.info_config.get_pressure_host())
+
+    @cached_property
+    def remote_humidity_in(self):
+        return remote.TendencyValue(self.info_config.get_humidity_host())
+
+    @cached_property
+    def remote_air_quality(self):
+        return remote.AirQuality(self.info_config.get_air_quality_host(),
+                                 norm_pm_10=self.info_config.get_air_quality_norm_pm_10(),
+                                 norm_pm_2_5=self.info_config.get_air_quality_norm_pm_2_5())
+
+    @cached_property
+    def remote_cesspit(self):
+        return remote.Cesspit(self.info_config.get_cesspit_host(),
+                              delay_denoting_failure_min=self.info_config.get_cesspit_delay_denoting_failure_min(),
+                              warning_level=self.info_config.get_cesspit_warning_level(),
+                              critical_level=self.info_config.get_cesspit_critical_level())
+
+    @cached_property
+    def remote_daylight(self):
+        return remote.Daylight(self.info_config.get_daylight_host())
+
+    @cached_property
+    def remote_rain(self):
+        return remote.Rain(self.info_config.get_rain_host())
+
+    @cached_property
+    def remote_soil_moisture(self):
+        return remote.SoilMoisture(self.info_config.get_soil_moisture_host())
 
     def current_temperature(self):
         return self.remote_temperature.current_temperature()
@@ -58,17 +96,24 @@ class InfoApp(Flask):
 
     @staticmethod
     def _datetime_fmt(to_convert: str):
-        return datetime.strptime(to_convert, '%Y-%m-%d')
+        # fromisoformat parses the fixed YYYY-MM-DD shape at C level; the guard keeps
+        # the accepted format as strict as it has always been
+        if len(to_convert) != 10 or to_convert[4] != '-' or to_convert[7] != '-':
+            raise ValueError(f'Date {to_convert} does not match the expected format YYYY-MM-DD')
+        return datetime.fromisoformat(to_convert)
 
     def graph_temperature(self):
+        # deferred import: matplotlib takes hundreds of milliseconds to load,
+        # no point paying for it at worker startup if no graph is ever requested
+        import analysis.graph as a_graph
+
         _sensor_location = frequest.args.get('location')
         _the_date = frequest.args.get('date', type=self._datetime_fmt)
         _title = frequest.args.get('title')
 
         _now = datetime.now()
-        _is_for_today = not _the_date or (_the_date.year == _now.year and
-                                          _the_date.month == _now.month and
-                                          _the_date.day == _now.day)
+        # single tuple comparison of the date parts instead of three attribute checks
+        _is_for_today = not _the_date or _the_date.date() == _now.date()
 
         if not _the_date or _is_for_today:
             _the_date = _now
@@ -80,7 +125,7 @@ class InfoApp(Flask):
             if cur_temp_reading:
                 cur_temp = cur_temp_reading.timestamp, cur_temp_reading.temperature
         else:
-            _the_date = _the_date.replace(hour=23, minute=59, second=59)
+            _the_date = a_data.day_end(_the_date)
 
         _graph = a_graph.DailyTemperatureGraph(
             data_source=self.data_source,
@@ -89,7 +134,23 @@ class InfoApp(Flask):
             last_temp=cur_temp,
             the_date=_the_date)
 
-        return Response(_graph.plot_to_svg(), mimetype='image/svg+xml')
+        _payload = _graph.plot_to_svg()
+        _headers = {'Vary': 'Accept-Encoding'}
+        if 'gzip' in frequest.headers.get('Accept-Encoding', ''):
+            # SVG is plain XML and typically shrinks several times over;
+            # a few milliseconds of CPU buy most of the transfer time back
+            _payload = gzip.compress(_payload, compresslevel=6)
+            _headers['Content-Encoding'] = 'gzip'
+
+        return Response(self._iter_chunks(_payload), mimetype='image/svg+xml',
+                        headers=_headers, direct_passthrough=True)
+
+    @staticmethod
+    def _iter_chunks(payload: bytes, chunk_size: int = 16 * 1024):
+        # serve the SVG in chunks, so the client can start parsing while
+        # the rest of the payload is still on the wire
+        for _offset in range(0, len(payload), chunk_size):
+            yield payload[_offset:_offset + chunk_size]
 
 
 # flask config
@@ -141,6 +202,31 @@ def graph_temperature():
     return app.graph_temperature()
 
 
+@app.after_request
+def finalize_response(response):
+    # sensor readings refresh on the order of seconds; declaring that upstream allows
+    # browsers and reverse proxies to answer most dashboard polls with cached data or 304
+    if frequest.path.startswith('/current/'):
+        response.cache_control.public = True
+        response.cache_control.max_age = 5
+        response.add_etag()
+        return response.make_conditional(frequest)
+    if frequest.path.startswith('/graph/'):
+        # a graph of any past day never changes, so the browser may keep it for a day;
+        # no ETag here - that would force buffering of the streamed SVG
+        _date = frequest.args.get('date')
+        try:
+            # same parser the handler uses; on a malformed date the handler silently
+            # renders today's graph, which must not be cached as an immutable past day
+            _is_historical = _date is not None \
+                and InfoApp._datetime_fmt(_date).date() < datetime.now().date()
+        except ValueError:
+            _is_historical = False
+        response.cache_control.public = True
+        response.cache_control.max_age = 86400 if _is_historical else 30
+    return response
+
+
 if __name__ == '__main__':
     # in debug mode start the server using flask built-in server
     # of course for production use mod-wsgi_express on Apache2
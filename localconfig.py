@@ -1,4 +1,5 @@
-from configparser import ConfigParser, ExtendedInterpolation
+from configparser import ConfigParser, ExtendedInterpolation, InterpolationError
+from os import stat
 import sys
 
 
@@ -29,63 +30,138 @@ class Configuration(ConfigParser):
     PARAM_CRITICAL_LEVEL = 'critical-level'
     PARAM_DELAY_DENOTING_FAILURE = 'delay-denoting-failure-min'
 
+    # target types of the non-string options; everything else stays a plain string
+    _OPTION_TYPES = {
+        PARAM_AQ_NORM_2_5: int,
+        PARAM_AQ_NORM_10: int,
+        PARAM_WARNING_LEVEL: float,
+        PARAM_CRITICAL_LEVEL: float,
+        PARAM_DELAY_DENOTING_FAILURE: int,
+    }
+
+    # results of parsing shared between instances: the files are tokenized and interpolated once
+    # per process, unless they change on disk (detected by the stat signature)
+    _cache_stamp = None
+    _cache_raw = None
+    _cache_resolved = None
+    _cache_temperature_hosts = None
+
     def __init__(self):
         ConfigParser.__init__(self, interpolation=ExtendedInterpolation())
-        if not sys.gettrace():
-            self.read([self.PATH_ENV, self.PATH_INI])
-        else:
-            self.read([self.PATH_ENV_DEBUG, self.PATH_INI_DEBUG])
+        _paths = [self.PATH_ENV, self.PATH_INI] if not sys.gettrace() \
+            else [self.PATH_ENV_DEBUG, self.PATH_INI_DEBUG]
+        _stamp = tuple(self._file_stamp(_path) for _path in _paths)
+
+        if _stamp == Configuration._cache_stamp:
+            self.read_dict(Configuration._cache_raw)
+            self._resolved = Configuration._cache_resolved
+            self._temperature_hosts = Configuration._cache_temperature_hosts
+            return
+
+        self.read(_paths)
+        # the interpolation (${...} references to credentials) is resolved here, only once,
+        # and the values are coerced to their target types right away; the accessors below
+        # are then plain dict reads without per-call interpolation or conversion
+        self._resolved = {}
+        for section in self.sections():
+            _values = self._resolved[section] = {}
+            for option in self.options(section):
+                try:
+                    _values[option] = self._convert(section, option,
+                                                    self.get(section=section, option=option))
+                except InterpolationError:
+                    # unresolvable reference (e.g. missing credentials file in a debug run);
+                    # as before, such option fails only when it is actually accessed
+                    pass
+
+        # the TEMPERATURE section is the only one with a variable number of hosts;
+        # scan it once here instead of on every accessor call
+        self._temperature_hosts = tuple(
+            value for option, value in self._resolved[self.SECTION_TEMPERATURE].items()
+            if option.startswith(self.PARAM_HOST))
+
+        Configuration._cache_raw = {section: dict(self.items(section, raw=True))
+                                    for section in self.sections()}
+        Configuration._cache_resolved = self._resolved
+        Configuration._cache_temperature_hosts = self._temperature_hosts
+        Configuration._cache_stamp = _stamp
+
+    @staticmethod
+    def _file_stamp(path_to_file: str) -> tuple:
+        try:
+            _stat = stat(path_to_file)
+            return path_to_file, _stat.st_mtime_ns, _stat.st_size
+        except OSError:
+            return path_to_file, None, None
+
+    def _value(self, section: str, option: str) -> str:
+        try:
+            return self._resolved[section][option]
+        except KeyError:
+            return self.get(section=section, option=option)
+
+    @staticmethod
+    def _as_url(host: str) -> str:
+        # endpoints are configured as bare host[:port][/path]; normalize to a full URL
+        # once here so no request-path code has to re-check the prefix
+        return host if host.startswith('http://') else 'http://' + host
+
+    def _convert(self, section: str, option: str, value: str):
+        # the database host is a bare address for the mariadb driver, all other hosts
+        # are HTTP endpoints
+        if section != self.SECTION_DB and option.startswith(self.PARAM_HOST):
+            return self._as_url(value)
+        _target_type = self._OPTION_TYPES.get(option)
+        return _target_type(value) if _target_type else value
 
     def get_db(self) -> str:
-        return self.get(section=self.SECTION_DB, option=self.PARAM_DB)
+        return self._value(section=self.SECTION_DB, option=self.PARAM_DB)
 
     def get_db_user(self) -> str:
-        return self.get(section=self.SECTION_DB, option=self.PARAM_USER)
+        return self._value(section=self.SECTION_DB, option=self.PARAM_USER)
 
     def get_db_password(self) -> str:
-        return self.get(section=self.SECTION_DB, option=self.PARAM_PASSWORD)
+        return self._value(section=self.SECTION_DB, option=self.PARAM_PASSWORD)
 
     def get_db_host(self) -> str:
-        return self.get(section=self.SECTION_DB, option=self.PARAM_HOST)
+        return self._value(section=self.SECTION_DB, option=self.PARAM_HOST)
 
-    def get_temperature_hosts(self) -> list:
-        return [self.get(section=self.SECTION_TEMPERATURE, option=option)
-                for option in self.options(self.SECTION_TEMPERATURE)
-                if option.startswith(self.PARAM_HOST)]
+    def get_temperature_hosts(self) -> tuple:
+        return self._temperature_hosts
 
     def get_pressure_host(self) -> str:
-        return self.get(section=self.SECTION_PRESSURE, option=self.PARAM_HOST)
+        return self._value(section=self.SECTION_PRESSURE, option=self.PARAM_HOST)
 
     def get_humidity_host(self) -> str:
-        return self.get(section=self.SECTION_HUMIDITY, option=self.PARAM_HOST)
+        return self._value(section=self.SECTION_HUMIDITY, option=self.PARAM_HOST)
 
     def get_air_quality_host(self) -> str:
-        return self.get(section=self.SECTION_AIRQUALITY, option=self.PARAM_HOST)
+        return self._value(section=self.SECTION_AIRQUALITY, option=self.PARAM_HOST)
 
     def get_air_quality_norm_pm_2_5(self) -> int:
-        return self.getint(section=self.SECTION_AIRQUALITY, option=self.PARAM_AQ_NORM_2_5)
+        return self._value(section=self.SECTION_AIRQUALITY, option=self.PARAM_AQ_NORM_2_5)
 
     def get_air_quality_norm_pm_10(self) -> int:
-        return self.getint(section=self.SECTION_AIRQUALITY, option=self.PARAM_AQ_NORM_10)
+        return self._value(section=self.SECTION_AIRQUALITY, option=self.PARAM_AQ_NORM_10)
 
     def get_cesspit_host(self) -> str:
-        return self.get(section=self.SECTION_CESSPIT, option=self.PARAM_HOST)
+        return self._value(section=self.SECTION_CESSPIT, option=self.PARAM_HOST)
 
     def get_cesspit_warning_level(self) -> float:
-        return self.getfloat(section=self.SECTION_CESSPIT, option=self.PARAM_WARNING_LEVEL)
+        return self._value(section=self.SECTION_CESSPIT, option=self.PARAM_WARNING_LEVEL)
 
     def get_cesspit_critical_level(self) -> float:
-        return self.getfloat(section=self.SECTION_CESSPIT, option=self.PARAM_CRITICAL_LEVEL)
+        return self._value(section=self.SECTION_CESSPIT, option=self.PARAM_CRITICAL_LEVEL)
 
     def get_cesspit_delay_denoting_failure_min(self) -> int:
-        return self.getint(section=self.SECTION_CESSPIT, option=self.PARAM_DELAY_DENOTING_FAILURE)
+        return self._value(section=self.SECTION_CESSPIT, option=self.PARAM_DELAY_DENOTING_FAILURE)
 
     def get_daylight_host(self) -> str:
-        return self.get(section=self.SECTION_DAYLIGHT, option=self.PARAM_HOST)
+        return self._value(section=self.SECTION_DAYLIGHT, option=self.PARAM_HOST)
 
     def get_rain_host(self) -> str:
-        return self.get(section=self.SECTION_RAIN, option=self.PARAM_HOST)
+        return self._value(section=self.SECTION_RAIN, option=self.PARAM_HOST)
 
     def get_soil_moisture_host(self) -> str:
-        return self.get(section=self.SECTION_SOIL_MOISTURE, option=self.PARAM_HOST)
+        return self._value(section=self.SECTION_SOIL_MOISTURE, option=self.PARAM_HOST)
 
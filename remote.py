@@ -1,74 +1,144 @@
 """
 Collects all routines related to communication with remote services, mainly to obtain current, close to runtime values
 """
+import numpy as np
 import requests
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import lru_cache
+from threading import Lock
+from time import monotonic
 
 from core.sbean import *
 from core.util import SunsetCalculator
 
+try:
+    # optional speed-up of payload deserialization; the stdlib parser is used when absent
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _response_json(response):
+    """
+    Deserializes the JSON payload of the given response, preferring orjson
+    (several times faster than the stdlib parser) when it is installed
+
+    :param response: the requests response to deserialize
+    :return: parsed payload (dict or list)
+    """
+    return orjson.loads(response.content) if orjson is not None else response.json()
+
+
+def _truncate_tenths(values: list) -> list:
+    """
+    Truncates the given numbers to one decimal place (display precision) in a single
+    vectorized pass; the toward-zero semantics of the former int(x*10)/10 is preserved
+
+    :param values: the numbers to truncate
+    :return: list of floats truncated to one decimal place
+    """
+    return (np.trunc(np.fromiter(values, dtype=np.float64, count=len(values)) * 10.0) / 10.0).tolist()
+
+# single executor shared by all remote clients; bounds the total number of concurrent
+# outbound calls and avoids spawning short-lived threads on the request path
+_IO_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix='remote-io')
+
+# one keep-alive session shared by all remote clients: repeated polls of the same sensor
+# reuse an established TCP connection instead of paying handshake + DNS per call
+_SESSION = requests.Session()
+_SESSION.mount('http://', requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
 
 class RemoteConnection:
 
+    # the sensors refresh their readings on the order of seconds, so briefly reusing
+    # the last response collapses bursts of dashboard polls into a single outbound call
+    CACHE_TTL_SEC = 1.0
+
     def __init__(self, endpoint: str):
         self.endpoint = endpoint
         if not self.endpoint.startswith('http://'):
              self.endpoint = 'http://' + endpoint
+        self._last_result = None
+        self._last_fetched_at = 0.0
+        self._fetch_lock = Lock()
 
     def make_request(self) -> tuple:
+        # single-flight: when a burst of handlers asks for the same endpoint, the first
+        # caller performs the fetch and the others wait for it, then hit the TTL cache
+        # below instead of issuing duplicate outbound requests
+        with self._fetch_lock:
+            return self._make_request()
+
+    def _make_request(self) -> tuple:
+        if self._last_result is not None and monotonic() - self._last_fetched_at < self.CACHE_TTL_SEC:
+            return self._last_result
+
         response = None
         error = None
 
         try:
             # there's direct Gigabit interface with the service; if does not respond within 1 sec, it is surely down
-            response = requests.get(self.endpoint, timeout=1)
-            # this will raise HttpError on erroneous responses:
-            response.raise_for_status()
-            # ...and this will also trigger error for unexpected (although non-erroneous) status codes
+            response = _SESSION.get(self.endpoint, timeout=1)
+            # a single numeric check covers both erroneous and non-typical status codes
             if response.status_code != 200:
-                error = ErrorJsonBean(f'Non-typical HTTP response code detected: {response.status_code}')
+                error = ErrorJsonBean(f'Host {self.endpoint} is responding, but with non-typical '
+                                      f'HTTP response code: {response.status_code}')
 
-        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-            error = NotAvailableJsonBean()
+        except requests.exceptions.RequestException as e:
+            error = self._classify_error(e)
 
-        except requests.exceptions.TooManyRedirects:
-            error = ErrorJsonBean(f'Host {self.endpoint} is not responding correctly. '
-                                  f'Too many redirects (?)')
+        self._last_result = error, response
+        self._last_fetched_at = monotonic()
 
-        except requests.exceptions.HTTPError as e:
-            error = ErrorJsonBean(f'Host {self.endpoint} is responding, but with erroneous code. '
-                                  f'Details: {str(e)}')
+        return error, response
 
-        except requests.exceptions.RequestException as e:
-            error = ErrorJsonBean(f'Host {self.endpoint} is not responding correctly. '
-                                  f'Details: {str(type(e))}: {str(e)}')
+    def _classify_error(self, exception: requests.exceptions.RequestException):
+        """
+        Translates a requests failure into the error bean reported to the client.
+        One handler with isinstance dispatch replaces the former chain of except clauses,
+        so the message is interpolated only on the branch actually taken
 
-        return error, response
+        :param exception: the failure raised while calling the endpoint
+        :return: error bean describing the failure
+        """
+        if isinstance(exception, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return NotAvailableJsonBean()
+        if isinstance(exception, requests.exceptions.TooManyRedirects):
+            return ErrorJsonBean(f'Host {self.endpoint} is not responding correctly. '
+                                 f'Too many redirects (?)')
+        return ErrorJsonBean(f'Host {self.endpoint} is not responding correctly. '
+                             f'Details: {str(type(exception))}: {str(exception)}')
 
 
 class Temperature:
 
-    def __init__(self, endpoints: list):
+    def __init__(self, endpoints: tuple):
         self.remotes = [RemoteConnection(ep) for ep in endpoints]
 
-    def _convert_temperature(self, temp: TemperatureReadingJson) -> TemperatureReadingJson:
+    @staticmethod
+    def _convert_temperatures(readings: list) -> list:
         """
-        This method is intended to adapt temperature from the raw reading to human-readable format
+        This method is intended to adapt temperatures from the raw readings to human-readable
+        format; the truncation to one decimal place is done in a single vectorized pass
 
-        :param temp: the original temperature reading
-        :return: the same bean, but with modified content
+        :param readings: the original temperature readings
+        :return: the same beans, but with modified content
         """
-        temp.temperature = int(temp.temperature*10.0)/10.0
-        return temp
+        for _reading, _temperature in zip(readings, _truncate_tenths([t.temperature for t in readings])):
+            _reading.temperature = _temperature
+        return readings
 
     def _consolidated_response(self) -> list:
         consolidated_response = list()
-        # make requests to all hosts
-        for host in self.remotes:
-            error, response = host.make_request()
+        # make requests to all hosts in parallel
+        for error, response in _IO_POOL.map(RemoteConnection.make_request, self.remotes):
             if not error and response:
-                consolidated_response.extend(json_to_bean(response.json()))
+                consolidated_response.extend(json_to_bean(_response_json(response)))
 
-        return [self._convert_temperature(t) for t in consolidated_response]
+        return self._convert_temperatures(consolidated_response)
 
     def current_temperature(self):
         """
@@ -110,7 +180,7 @@ class TendencyValue(RemoteConnection):
         if error:
             return bean_jsonified(error)
 
-        val = json_to_bean(response.json())
+        val = json_to_bean(_response_json(response))
         val.current_value = int(val.current_value)
         val.current_mean = int(val.current_mean)
         val.previous_mean = int(val.previous_mean)
@@ -132,7 +202,7 @@ class AirQuality(RemoteConnection):
             return bean_jsonified(error)
 
         return bean_jsonified(AirQualityInterpretedReadingJson(
-            reading=json_to_bean(response.json()),
+            reading=json_to_bean(_response_json(response)),
             norm={AirQualityInterpretedReadingJson.PM_10: self.norm_pm_10,
                   AirQualityInterpretedReadingJson.PM_2_5: self.norm_pm_2_5}))
 
@@ -151,7 +221,7 @@ class Cesspit(RemoteConnection):
         if error:
             return bean_jsonified(error)
 
-        reading = json_to_bean(response.json())
+        reading = json_to_bean(_response_json(response))
         failure = (datetime.now() - reading.timestamp).total_seconds()/60 > self.delay_denoting_failure_min
 
         return bean_jsonified(CesspitInterpretedReadingJson(
@@ -161,11 +231,34 @@ class Cesspit(RemoteConnection):
             critical_level_perc=self.critical_level))
 
 
+# times-of-day corresponding to the slots between the boundaries provided by _sun_times
+_TIME_OF_DAY_SLOTS = (TimeOfDay.NIGHT, TimeOfDay.MORNING, TimeOfDay.MIDDAY,
+                      TimeOfDay.EVENING, TimeOfDay.NIGHT)
+
+
+@lru_cache(maxsize=2)
+def _sun_times(day_ordinal: int) -> tuple:
+    """
+    Provides sunrise and sunset details calculated at most once per calendar day.
+    The day ordinal serves as the cache key, so the cache refreshes itself at midnight
+
+    :param day_ordinal: proleptic ordinal of the day the times are valid for
+    :return: tuple of (time-of-day boundaries: sunrise, end of morning, start of evening,
+             sunset; sunrise HH:MM, sunset HH:MM)
+    """
+    _calc = SunsetCalculator()
+    _sunrise = _calc.sunrise()
+    _sunset = _calc.sunset()
+    # morning and evening take the first and the last 20% of the day duration
+    _day_duration = _sunset - _sunrise
+    return ((_sunrise, _sunrise + 0.2*_day_duration, _sunset - 0.2*_day_duration, _sunset),
+            _sunrise.strftime('%H:%M'), _sunset.strftime('%H:%M'))
+
+
 class Daylight(RemoteConnection):
 
     def __init__(self, endpoint: str):
         RemoteConnection.__init__(self, endpoint)
-        self._calc = SunsetCalculator()
 
     def current_status(self):
         error, response = self.make_request()
@@ -173,25 +266,16 @@ class Daylight(RemoteConnection):
         if error:
             return bean_jsonified(error)
 
-        _reading = json_to_bean(response.json())
-
-        # calculate time-of-day, set sunset\sunshine
-        _tod = TimeOfDay.NIGHT
+        _reading = json_to_bean(_response_json(response))
+        _boundaries, _sunrise_hhmm, _sunset_hhmm = _sun_times(date.today().toordinal())
 
-        if self._calc.sunrise() < _reading.timestamp < self._calc.sunset():
-            _day_duration_sec = (self._calc.sunset() - self._calc.sunrise()).total_seconds()
-            # morning is at most 20% of day duration away from sunset
-            if (_reading.timestamp - self._calc.sunrise()).total_seconds() < 0.2*_day_duration_sec:
-                _tod = TimeOfDay.MORNING
-            elif (self._calc.sunset() - _reading.timestamp).total_seconds() < 0.2*_day_duration_sec:
-                _tod = TimeOfDay.EVENING
-            else:
-                _tod = TimeOfDay.MIDDAY
+        # calculate time-of-day: a single bisect over the daily boundaries maps the
+        # timestamp onto night\morning\midday\evening\night
+        _tod = _TIME_OF_DAY_SLOTS[bisect_right(_boundaries, _reading.timestamp)]
 
         return bean_jsonified(DaylightInterpretedReadingJson(
             reading=_reading, time_of_day=_tod,
-            sunrise=self._calc.sunrise().strftime('%H:%M'),
-            sunset=self._calc.sunset().strftime('%H:%M')))
+            sunrise=_sunrise_hhmm, sunset=_sunset_hhmm))
 
 
 class Rain(RemoteConnection):
@@ -205,9 +289,9 @@ class Rain(RemoteConnection):
         if error:
             return bean_jsonified(error)
 
-        rain_intensity = json_to_bean(response.json())
-
-        return bean_jsonified(rain_intensity)
+        # the reading is served unchanged, so skip the parse + re-serialize round-trip
+        # and hand the upstream payload over to flask as-is
+        return response.content, response.status_code, {'Content-Type': 'application/json'}
 
 
 class SoilMoisture(RemoteConnection):
@@ -221,9 +305,9 @@ class SoilMoisture(RemoteConnection):
         if error:
             return bean_jsonified(error)
 
-        results = json_to_bean(response.json())
+        results = json_to_bean(_response_json(response))
 
-        for humidity in results:
-            humidity.current_value = int(humidity.current_value*10.0)/10.0
+        for humidity, _value in zip(results, _truncate_tenths([h.current_value for h in results])):
+            humidity.current_value = _value
 
         return bean_jsonified(results)